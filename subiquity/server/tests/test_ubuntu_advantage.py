@@ -13,9 +13,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from subprocess import CompletedProcess
+import asyncio
+import gc
+import subprocess
 import unittest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, Mock
 
 from subiquity.common.types import UbuntuProService
 from subiquity.server.ubuntu_advantage import (
@@ -38,6 +40,19 @@ class TestMockedUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
         with self.assertRaises(InvalidTokenError):
             await self.strategy.query_info(token="invalidToken")
 
+    async def test_query_info_empty_no_delay(self):
+        # Empty tokens are rejected without simulating a query, whereas
+        # tokens starting with "i" simulate an answer from the server.
+        with patch("subiquity.server.ubuntu_advantage.asyncio.sleep",
+                   new_callable=AsyncMock) as mock_sleep:
+            with self.assertRaises(InvalidTokenError):
+                await self.strategy.query_info(token="")
+            mock_sleep.assert_not_awaited()
+
+            with self.assertRaises(InvalidTokenError):
+                await self.strategy.query_info(token="iToken")
+            mock_sleep.assert_awaited_once_with(self.strategy.delay)
+
     async def test_query_info_failure(self):
         # Tokens starting with "f" in dry-run mode simulate an "internal"
         # error.
@@ -54,9 +69,21 @@ class TestMockedUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
         info = await self.strategy.query_info(token="validToken")
         self.assertEqual(info["expires"], "2035-12-31T00:00:00+00:00")
 
+    async def test_query_info_cached(self):
+        # The example files are only parsed once.
+        info1 = await self.strategy.query_info(token="validToken")
+        info2 = await self.strategy.query_info(token="validToken2")
+        self.assertIs(info1, info2)
+
 
 class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
-    arun_command_sym = "subiquity.server.ubuntu_advantage.utils.arun_command"
+    astart_command_sym = \
+        "subiquity.server.ubuntu_advantage.utils.astart_command"
+
+    def mock_process(self, returncode: int, stdout: bytes) -> Mock:
+        proc = Mock(returncode=returncode)
+        proc.communicate = AsyncMock(return_value=(stdout, b""))
+        return proc
 
     def test_init(self):
         # Default initializer.
@@ -83,11 +110,11 @@ class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
             "--simulate-with-token", "123456789",
         )
 
-        with patch(self.arun_command_sym) as mock_arun:
-            mock_arun.return_value = CompletedProcess([], 0)
-            mock_arun.return_value.stdout = "{}"
+        with patch(self.astart_command_sym) as mock_astart:
+            mock_astart.return_value = self.mock_process(0, b"{}")
             await strategy.query_info(token="123456789")
-            mock_arun.assert_called_once_with(command, check=False)
+            mock_astart.assert_called_once_with(
+                command, stdin=subprocess.DEVNULL)
 
     async def test_query_info_unknown_error(self):
         strategy = UAClientUAInterfaceStrategy()
@@ -98,12 +125,12 @@ class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
             "--simulate-with-token", "123456789",
         )
 
-        with patch(self.arun_command_sym) as mock_arun:
-            mock_arun.return_value.returncode = 2
-            mock_arun.return_value.stdout = "{}"
+        with patch(self.astart_command_sym) as mock_astart:
+            mock_astart.return_value = self.mock_process(2, b"{}")
             with self.assertRaises(CheckSubscriptionError):
                 await strategy.query_info(token="123456789")
-            mock_arun.assert_called_once_with(command, check=False)
+            mock_astart.assert_called_once_with(
+                command, stdin=subprocess.DEVNULL)
 
     async def test_query_info_invalid_token(self):
         strategy = UAClientUAInterfaceStrategy()
@@ -114,12 +141,43 @@ class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
             "--simulate-with-token", "123456789",
         )
 
-        with patch(self.arun_command_sym) as mock_arun:
-            mock_arun.return_value.returncode = 1
-            mock_arun.return_value.stdout = """\
+        with patch(self.astart_command_sym) as mock_astart:
+            mock_astart.return_value = self.mock_process(1, b"""\
+{
+  "environment_vars": [],
+  "errors": [
+    {
+      "message": "Invalid token. See https://ubuntu.com/advantage",
+      "message_code": "attach-invalid-token",
+      "service": null,
+      "type": "system"
+    }
+  ],
+  "result": "failure",
+  "services": [],
+  "warnings": []
+}
+""")
+            with self.assertRaises(InvalidTokenError):
+                await strategy.query_info(token="123456789")
+            mock_astart.assert_called_once_with(
+                command, stdin=subprocess.DEVNULL)
+
+    async def test_query_info_invalid_token_incomplete_errors(self):
+        # An error entry without message_code must not prevent us from
+        # finding the invalid token error that follows.
+        strategy = UAClientUAInterfaceStrategy()
+
+        with patch(self.astart_command_sym) as mock_astart:
+            mock_astart.return_value = self.mock_process(1, b"""\
 {
   "environment_vars": [],
   "errors": [
+    {
+      "message": "Something unexpected happened",
+      "service": null,
+      "type": "system"
+    },
     {
       "message": "Invalid token. See https://ubuntu.com/advantage",
       "message_code": "attach-invalid-token",
@@ -131,10 +189,9 @@ class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
   "services": [],
   "warnings": []
 }
-"""
+""")
             with self.assertRaises(InvalidTokenError):
                 await strategy.query_info(token="123456789")
-            mock_arun.assert_called_once_with(command, check=False)
 
     async def test_query_info_invalid_json(self):
         strategy = UAClientUAInterfaceStrategy()
@@ -145,16 +202,105 @@ class TestUAClientUAInterfaceStrategy(unittest.IsolatedAsyncioTestCase):
             "--simulate-with-token", "123456789",
         )
 
-        with patch(self.arun_command_sym) as mock_arun:
-            mock_arun.return_value = CompletedProcess([], 0)
-            mock_arun.return_value.stdout = "invalid-json"
+        with patch(self.astart_command_sym) as mock_astart:
+            mock_astart.return_value = self.mock_process(0, b"invalid-json")
             with self.assertRaises(CheckSubscriptionError):
                 await strategy.query_info(token="123456789")
-            mock_arun.assert_called_once_with(command, check=False)
+            mock_astart.assert_called_once_with(
+                command, stdin=subprocess.DEVNULL)
+
+    async def test_query_info_timeout(self):
+        strategy = UAClientUAInterfaceStrategy()
+        strategy.timeout = 0.001
+
+        async def never_return():
+            await asyncio.Event().wait()
+
+        with patch(self.astart_command_sym) as mock_astart:
+            proc = mock_astart.return_value = Mock()
+            proc.communicate = never_return
+            proc.wait = AsyncMock()
+            with self.assertRaises(CheckSubscriptionError):
+                await strategy.query_info(token="123456789")
+            proc.kill.assert_called_once_with()
+            proc.wait.assert_awaited_once_with()
 
 
 class TestUAInterface(unittest.IsolatedAsyncioTestCase):
 
+    async def test_get_subscription_status_cached(self):
+        strategy = MockedUAInterfaceStrategy(scale_factor=1_000_000)
+        interface = UAInterface(strategy)
+
+        with patch.object(strategy, "query_info",
+                          wraps=strategy.query_info) as mock_query:
+            await interface.get_subscription_status(token="validToken")
+            await interface.get_subscription_status(token="validToken")
+            mock_query.assert_called_once_with("validToken")
+
+            # Errors are not cached.
+            for _ in range(2):
+                with self.assertRaises(InvalidTokenError):
+                    await interface.get_subscription_status(token="iToken")
+            self.assertEqual(mock_query.call_count, 3)
+
+            # Entries expire after a while.
+            interface.cache_ttl = 0
+            await interface.get_subscription_status(token="otherToken")
+            await interface.get_subscription_status(token="otherToken")
+            self.assertEqual(mock_query.call_count, 5)
+
+    async def test_get_subscription_status_concurrent(self):
+        strategy = MockedUAInterfaceStrategy(scale_factor=1_000_000)
+        interface = UAInterface(strategy)
+
+        with patch.object(strategy, "query_info",
+                          wraps=strategy.query_info) as mock_query:
+            info1, info2 = await asyncio.gather(
+                interface.get_subscription_status(token="validToken"),
+                interface.get_subscription_status(token="validToken"))
+            mock_query.assert_called_once_with("validToken")
+            self.assertIs(info1, info2)
+
+    async def test_get_subscription_status_cancelled(self):
+        strategy = MockedUAInterfaceStrategy(scale_factor=1_000_000)
+        interface = UAInterface(strategy)
+        unblock = asyncio.Event()
+
+        async def query_info(token):
+            await unblock.wait()
+            if token == "failure":
+                raise CheckSubscriptionError(token)
+            return {"token": token}
+
+        loop = asyncio.get_running_loop()
+        exception_handler = Mock()
+        loop.set_exception_handler(exception_handler)
+
+        with patch.object(strategy, "query_info",
+                          side_effect=query_info) as mock_query:
+            for token in ("validToken", "failure"):
+                caller = asyncio.create_task(
+                    interface.get_subscription_status(token=token))
+                await asyncio.sleep(0)
+                caller.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await caller
+            unblock.set()
+            for _ in range(5):
+                await asyncio.sleep(0)
+            self.assertEqual(mock_query.call_count, 2)
+
+            # The result of the query is cached even though the only caller
+            # was cancelled.
+            info = await interface.get_subscription_status(token="validToken")
+            self.assertEqual({"token": "validToken"}, info)
+            self.assertEqual(mock_query.call_count, 2)
+
+        # The error is retrieved rather than reported as never retrieved.
+        gc.collect()
+        exception_handler.assert_not_called()
+
     async def test_mocked_get_subscription(self):
         strategy = MockedUAInterfaceStrategy(scale_factor=1_000_000)
         interface = UAInterface(strategy)
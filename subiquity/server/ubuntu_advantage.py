@@ -18,10 +18,12 @@ helper. """
 from abc import ABC, abstractmethod
 from datetime import datetime as dt
 import contextlib
-import json
+import functools
+from json import JSONDecodeError, loads as json_loads
 import logging
-from subprocess import CompletedProcess
-from typing import List, Sequence, Union
+import subprocess
+import time
+from typing import Dict, List, Sequence, Tuple, Union
 import asyncio
 
 from subiquity.common.types import (
@@ -68,11 +70,21 @@ class UAInterfaceStrategy(ABC):
         provided.  """
 
 
+@functools.lru_cache(maxsize=None)
+def _load_fixture(path: str) -> dict:
+    """ Load and parse the JSON example file at the given path. The result is
+    cached so that each file is only read once per process ; callers must not
+    modify the returned dictionary. """
+    with open(path, "rb") as stream:
+        return json_loads(stream.read())
+
+
 class MockedUAInterfaceStrategy(UAInterfaceStrategy):
     """ Mocked version of the Ubuntu Advantage interface strategy. The info it
     returns is based on example files and appearance of the UA token. """
     def __init__(self, scale_factor: int = 1):
-        self.scale_factor = scale_factor
+        # Simulated duration of a query, in seconds.
+        self.delay: float = 1 / scale_factor
         super().__init__()
 
     async def query_info(self, token: str) -> dict:
@@ -85,11 +97,12 @@ class MockedUAInterfaceStrategy(UAInterfaceStrategy):
         * Tokens starting with "i" will be considered invalid.
         * Tokens starting with "f" will generate an internal error.
         """
-        await asyncio.sleep(1 / self.scale_factor)
-
         if not token:
+            # Like the real strategy, reject empty tokens without querying.
             raise InvalidTokenError(token)
 
+        await asyncio.sleep(self.delay)
+
         if token[0] == "x":
             path = "examples/uaclient-status-expired.json"
         elif token[0] == "i":
@@ -99,8 +112,7 @@ class MockedUAInterfaceStrategy(UAInterfaceStrategy):
         else:
             path = "examples/uaclient-status-valid.json"
 
-        with open(path, encoding="utf-8") as stream:
-            return json.load(stream)
+        return _load_fixture(path)
 
 
 class UAClientUAInterfaceStrategy(UAInterfaceStrategy):
@@ -108,6 +120,10 @@ class UAClientUAInterfaceStrategy(UAInterfaceStrategy):
     """
     Executable = Union[str, Sequence[str]]
 
+    # u-a-c contacts the contract server and can hang on network issues. Give
+    # up after this many seconds.
+    timeout: float = 30
+
     def __init__(self, executable: Executable = "ubuntu-advantage") -> None:
         """ Initialize the strategy using the path to the ubuntu-advantage
         executable we want to use. The executable can be specified as a
@@ -116,6 +132,12 @@ class UAClientUAInterfaceStrategy(UAInterfaceStrategy):
         """
         self.executable: List[str] = \
             [executable] if isinstance(executable, str) else list(executable)
+        self._command_prefix: Tuple[str, ...] = (
+            *self.executable,
+            "status",
+            "--format", "json",
+            "--simulate-with-token",
+        )
         super().__init__()
 
     async def query_info(self, token: str) -> dict:
@@ -128,39 +150,47 @@ class UAClientUAInterfaceStrategy(UAInterfaceStrategy):
             # token is empty ; so let's not call it at all.
             raise InvalidTokenError(token)
 
-        command = tuple(self.executable) + (
-            "status",
-            "--format", "json",
-            "--simulate-with-token", token,
-        )
+        command = (*self._command_prefix, token)
 
         # On error, the command will exit with status 1. When that happens, the
         # output should still be formatted as a JSON object and we can inspect
         # it to know the reason of the failure. This is how we figure out if
         # the contract token was invalid.
-        proc: CompletedProcess = await utils.arun_command(command, check=False)
-        if proc.returncode == 0:
-            # TODO check if we're not returning a string or a list
-            try:
-                return json.loads(proc.stdout)
-            except json.JSONDecodeError:
-                log.exception("Failed to parse output of command %r", command)
-        elif proc.returncode == 1:
+        proc: asyncio.subprocess.Process = \
+            await utils.astart_command(command, stdin=subprocess.DEVNULL)
+        # Read the output while u-a-c is running and keep it as bytes ; the
+        # JSON parser accepts them directly.
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(),
+                                               timeout=self.timeout)
+        except asyncio.TimeoutError:
+            log.warning("Command %r timed out", command)
+            proc.kill()
+            await proc.wait()
+            raise CheckSubscriptionError(
+                    token, message="ubuntu-advantage timed out")
+        log.debug("Command %r exited with code %s", command, proc.returncode)
+
+        if proc.returncode in (0, 1):
             try:
-                data = json.loads(proc.stdout)
-            except json.JSONDecodeError:
-                log.exception("Failed to parse output of command %r", command)
+                data = json_loads(stdout)
+            except JSONDecodeError as exc:
+                log.warning("Failed to parse output of command %r: %s",
+                            command, exc)
             else:
-                token_invalid = False
-                with contextlib.suppress(KeyError):
-                    for error in data["errors"]:
-                        if error["message_code"] == "attach-invalid-token":
-                            token_invalid = True
+                if proc.returncode == 0:
+                    # TODO check if we're not returning a string or a list
+                    return data
+
+                errors = data.get("errors") or ()
+                if log.isEnabledFor(logging.DEBUG):
+                    for error in errors:
                         log.debug("error reported by u-a-c: %s: %s",
-                                  error["message_code"], error["message"])
-                if token_invalid:
+                                  error.get("message_code"),
+                                  error.get("message"))
+                if any(error.get("message_code") == "attach-invalid-token"
+                       for error in errors):
                     raise InvalidTokenError(token)
-
         else:
             log.exception("Failed to execute command %r", command)
 
@@ -168,14 +198,65 @@ class UAClientUAInterfaceStrategy(UAInterfaceStrategy):
         raise CheckSubscriptionError(token, message=message)
 
 
+@functools.lru_cache(maxsize=16)
+def _parse_expiry(expires: str) -> float:
+    """ Return the expiration date as a POSIX timestamp. """
+    # Sometimes, a time zone offset of 0 is replaced by the letter Z. This
+    # is specified in RFC 3339 but not supported by fromisoformat.
+    # See https://bugs.python.org/issue35829
+    if expires.endswith("Z"):
+        expires = expires[:-1] + "+00:00"
+    return dt.fromisoformat(expires).timestamp()
+
+
 class UAInterface:
     """ Interface to obtain Ubuntu Advantage subscription information. """
+    # Subscription information is kept for this many seconds so that the same
+    # token can be checked repeatedly without querying the strategy again.
+    cache_ttl: float = 60
+    cache_size: int = 16
+
     def __init__(self, strategy: UAInterfaceStrategy):
         self.strategy = strategy
+        self._cache: Dict[str, Tuple[float, dict]] = {}
+        # Queries that are still running, so that concurrent checks of the
+        # same token share a single invocation of the strategy.
+        self._pending: Dict[str, asyncio.Task] = {}
 
     async def get_subscription_status(self, token: str) -> dict:
         """ Return a dictionary containing the subscription information. """
-        return await self.strategy.query_info(token)
+        with contextlib.suppress(KeyError):
+            expiry, info = self._cache[token]
+            if time.monotonic() < expiry:
+                return info
+
+        task = self._pending.get(token)
+        if task is None:
+            task = asyncio.create_task(self.strategy.query_info(token))
+            self._pending[token] = task
+            task.add_done_callback(functools.partial(self._query_done, token))
+
+        # The task is shielded so that a cancelled caller does not cancel the
+        # query for the others.
+        return await asyncio.shield(task)
+
+    def _query_done(self, token: str, task: asyncio.Task) -> None:
+        """ Cache the result of a finished query, even if all the callers
+        waiting for it have been cancelled. """
+        del self._pending[token]
+        if task.cancelled():
+            return
+        # Retrieve the exception so that it does not get reported as never
+        # retrieved. Errors are propagated to the callers without being
+        # cached.
+        if task.exception() is not None:
+            return
+
+        self._cache.pop(token, None)
+        if len(self._cache) >= self.cache_size:
+            # Evict the oldest entry.
+            del self._cache[next(iter(self._cache))]
+        self._cache[token] = (time.monotonic() + self.cache_ttl, task.result())
 
     async def get_subscription(self, token: str) -> UbuntuProSubscription:
         """ Return the name of the contract, the name of the account and the
@@ -184,34 +265,22 @@ class UAInterface:
         """
         info = await self.get_subscription_status(token)
 
-        # Sometimes, a time zone offset of 0 is replaced by the letter Z. This
-        # is specified in RFC 3339 but not supported by fromisoformat.
-        # See https://bugs.python.org/issue35829
-        expiration = dt.fromisoformat(info["expires"].replace("Z", "+00:00"))
-        if expiration.timestamp() <= dt.utcnow().timestamp():
+        if _parse_expiry(info["expires"]) <= time.time():
             raise ExpiredTokenError(token, expires=info["expires"])
 
-        def is_activable_service(service: dict) -> bool:
-            # - the available field for a service refers to its availability on
-            # the current machine (e.g. on Focal running on a amd64 CPU) ;
-            # whereas
-            # - the entitled field tells us if the contract covers the service.
-            return service["available"] == "yes" \
-               and service["entitled"] == "yes"
-
-        def service_from_dict(service: dict) -> UbuntuProService:
-            return UbuntuProService(
-               name=service["name"],
-               description=service["description"],
-               auto_enabled=service["auto_enabled"] == "yes",
+        # - the available field for a service refers to its availability on
+        # the current machine (e.g. on Focal running on a amd64 CPU) ;
+        # whereas
+        # - the entitled field tells us if the contract covers the service.
+        activable_services: List[UbuntuProService] = [
+            UbuntuProService(
+                name=service["name"],
+                description=service["description"],
+                auto_enabled=service["auto_enabled"] == "yes",
             )
-
-        activable_services: List[UbuntuProService] = []
-
-        for service in info["services"]:
-            if not is_activable_service(service):
-                continue
-            activable_services.append(service_from_dict(service))
+            for service in info["services"]
+            if service["available"] == "yes" and service["entitled"] == "yes"
+        ]
 
         return UbuntuProSubscription(
                 account_name=info["account"]["name"],
@@ -15,8 +15,16 @@
 
 # from unittest.mock import Mock
 
+import asyncio
+import unittest
+
 from subiquitycore.tests import SubiTestCase
-from subiquitycore.utils import orig_environ
+from subiquitycore.utils import (
+    arun_command,
+    astart_command,
+    orig_environ,
+    run_command,
+    )
 
 
 class TestOrigEnviron(SubiTestCase):
@@ -62,3 +70,33 @@ class TestOrigEnviron(SubiTestCase):
             'PATH': '/usr/bin:/bin',
         }
         self.assertEqual(expected, orig_environ(env))
+
+
+class TestRunCommand(SubiTestCase):
+    def test_encoding(self):
+        proc = run_command(["cat"], input="{}")
+        self.assertEqual("{}", proc.stdout)
+
+    def test_no_encoding(self):
+        # With encoding=None, input and output are passed through as bytes.
+        proc = run_command(["cat"], input=b"{}", encoding=None)
+        self.assertEqual(b"{}", proc.stdout)
+
+
+class TestArunCommand(unittest.IsolatedAsyncioTestCase):
+    async def test_encoding(self):
+        proc = await arun_command(["cat"], input="{}")
+        self.assertEqual("{}", proc.stdout)
+
+    async def test_no_encoding(self):
+        # With encoding=None, input and output are passed through as bytes.
+        proc = await arun_command(["cat"], input=b"{}", encoding=None)
+        self.assertEqual(b"{}", proc.stdout)
+
+
+class TestAstartCommand(unittest.IsolatedAsyncioTestCase):
+    async def test_stdin_devnull(self):
+        # By default, the child must not inherit our stdin.
+        proc = await astart_command(["cat"])
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
+        self.assertEqual(b"", stdout)
@@ -59,7 +59,7 @@ def run_command(cmd: Sequence[str], *, input=None, stdout=subprocess.PIPE,
     """
     if input is None:
         kw['stdin'] = subprocess.DEVNULL
-    else:
+    elif encoding:
         input = input.encode(encoding)
     log.debug("run_command called: %s", cmd)
     try:
@@ -88,7 +88,8 @@ async def arun_command(cmd: Sequence[str], *,
             kw['stdin'] = subprocess.DEVNULL
     else:
         kw['stdin'] = subprocess.PIPE
-        input = input.encode(encoding)
+        if encoding:
+            input = input.encode(encoding)
     log.debug("arun_command called: %s", cmd)
     proc = await asyncio.create_subprocess_exec(
         *cmd, stdout=stdout, stderr=stderr, env=_clean_env(env), **kw)
@@ -113,7 +114,7 @@ async def astart_command(cmd: Sequence[str], *, stdout=subprocess.PIPE,
                          env=None, **kw) -> asyncio.subprocess.Process:
     log.debug("astart_command called: %s", cmd)
     return await asyncio.create_subprocess_exec(
-        *cmd, stdout=stdout, stderr=stderr,
+        *cmd, stdin=stdin, stdout=stdout, stderr=stderr,
         env=_clean_env(env), **kw)
 
 